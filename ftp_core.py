@@ -0,0 +1,674 @@
+import os
+import ssl
+import json
+import zlib
+import queue
+import sqlite3
+import stat
+import ftplib
+import posixpath
+import threading
+import time
+import mimetypes
+from datetime import datetime
+from pathlib import Path
+
+SERVER_DEFAULTS = {
+    'parallelism': 4,
+    'buffer_size': 64 * 1024,
+    'rate_limit': 0,
+}
+
+LOCAL_MTIME_GRANULARITY_NS = 2 * 10**9
+
+SEARCH_LIMIT = 1000
+
+COMPRESSED_EXTENSIONS = {
+    '.gz', '.tgz', '.bz2', '.xz', '.zst', '.zip', '.7z', '.rar',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp3', '.mp4', '.mkv', '.avi', '.mov',
+}
+
+class CompressedReader:
+    def __init__(self, fp):
+        self.fp = fp
+        self.compressor = zlib.compressobj()
+        self.finished = False
+
+    def read(self, size):
+        while not self.finished:
+            data = self.fp.read(size)
+            if not data:
+                self.finished = True
+                return self.compressor.flush()
+            data = self.compressor.compress(data)
+            if data:
+                return data
+        return b''
+
+class FXPRefused(Exception):
+    pass
+
+class RateLimiter:
+    def __init__(self, rate):
+        self.rate = rate
+        self.start = time.monotonic()
+        self.consumed = 0
+
+    def consume(self, size):
+        if not self.rate:
+            return
+        self.consumed += size
+        delay = self.consumed / self.rate - (time.monotonic() - self.start)
+        if delay > 0:
+            time.sleep(delay)
+
+class ModeZMixin:
+    mode_z = False
+
+    def enable_compression(self):
+        try:
+            features = self.sendcmd('FEAT')
+        except ftplib.error_perm:
+            return False
+        self.mode_z = any(line.strip().upper() == 'MODE Z' for line in features.splitlines()[1:])
+        return self.mode_z
+
+    def use_compression(self, cmd):
+        name = cmd.split(' ', 1)[-1]
+        return self.mode_z and os.path.splitext(name)[1].lower() not in COMPRESSED_EXTENSIONS
+
+    def compressed_transfer(self, transfer):
+        self.voidcmd('MODE Z')
+        try:
+            resp = transfer()
+        except:
+            try:
+                self.voidcmd('MODE S')
+            except ftplib.all_errors:
+                pass
+            raise
+        self.voidcmd('MODE S')
+        return resp
+
+    def retrbinary(self, cmd, callback, blocksize=8192, rest=None):
+        if not self.use_compression(cmd):
+            return super().retrbinary(cmd, callback, blocksize, rest)
+
+        decompressor = zlib.decompressobj()
+        def write(data):
+            data = decompressor.decompress(data)
+            if data:
+                callback(data)
+
+        resp = self.compressed_transfer(lambda: super(ModeZMixin, self).retrbinary(cmd, write, blocksize, rest))
+        data = decompressor.flush()
+        if data:
+            callback(data)
+        return resp
+
+    def storbinary(self, cmd, fp, blocksize=8192, callback=None, rest=None):
+        if not self.use_compression(cmd):
+            return super().storbinary(cmd, fp, blocksize, callback, rest)
+        return self.compressed_transfer(
+            lambda: super(ModeZMixin, self).storbinary(cmd, CompressedReader(fp), blocksize, callback, rest)
+        )
+
+class ClientFTP(ModeZMixin, ftplib.FTP):
+    pass
+
+class ClientFTP_TLS(ModeZMixin, ftplib.FTP_TLS):
+    def ntransfercmd(self, cmd, rest=None):
+        conn, size = ftplib.FTP.ntransfercmd(self, cmd, rest)
+        if self._prot_p:
+            conn = self.context.wrap_socket(
+                conn,
+                server_hostname=self.host,
+                session=self.sock.session
+            )
+        return conn, size
+
+def format_size(size):
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size < 1024.0:
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} PB"
+
+def server_setting(info, key):
+    if info and info.get(key) is not None:
+        return int(info[key])
+    return SERVER_DEFAULTS[key]
+
+def tls_context(info):
+    context = ssl.create_default_context()
+    if info.get('tls_skip_verify'):
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+def create_session(info, context=None):
+    if info.get('tls'):
+        ftp = ClientFTP_TLS(context=context or tls_context(info))
+    else:
+        ftp = ClientFTP()
+    ftp.connect(info['host'], int(info['port']))
+    ftp.login(info['username'], info['password'])
+    if info.get('tls'):
+        ftp.prot_p()
+    if info.get('compress'):
+        ftp.enable_compression()
+    return ftp
+
+def close_session(ftp):
+    if ftp.sock is None:
+        return
+    try:
+        ftp.quit()
+    except ftplib.all_errors:
+        ftp.close()
+
+def parse_list_line(line):
+    parts = line.split(None, 8)
+    if len(parts) < 9:
+        return None
+
+    permissions = parts[0]
+    name = parts[8]
+    if permissions.startswith('l') and ' -> ' in name:
+        name = name.split(' -> ', 1)[0]
+
+    return {
+        'name': name,
+        'size': int(parts[4]),
+        'date': ' '.join(parts[5:8]),
+        'permissions': permissions,
+        'is_dir': permissions.startswith('d')
+    }
+
+def list_remote_dir(ftp, path):
+    file_list = []
+    ftp.cwd(path)
+    ftp.retrlines('LIST', file_list.append)
+
+    entries = []
+    for line in file_list:
+        try:
+            info = parse_list_line(line)
+        except ValueError:
+            continue
+        if info and info['name'] not in ('.', '..'):
+            entries.append(info)
+    return entries
+
+def walk_remote_tree(ftp, path, errors):
+    files, dirs = [], [path]
+    pending = [path]
+    while pending:
+        current = pending.pop()
+        try:
+            entries = list_remote_dir(ftp, current)
+        except ftplib.error_perm as e:
+            errors.append(f"{current}: {e}")
+            continue
+
+        for info in entries:
+            full_path = posixpath.join(current, info['name'])
+            if info['is_dir']:
+                dirs.append(full_path)
+                pending.append(full_path)
+            else:
+                files.append(full_path)
+    return files, dirs
+
+def report(progress, text):
+    if progress:
+        progress(text)
+
+def run_pooled(info, paths, action, label, progress=None):
+    pending = queue.Queue()
+    for path in paths:
+        pending.put(path)
+
+    total = len(paths)
+    errors = []
+    done = [0]
+    succeeded = [0]
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            ftp = create_session(info)
+        except ftplib.all_errors as e:
+            with lock:
+                errors.append(f"Connection failed: {e}")
+            return
+
+        try:
+            while True:
+                try:
+                    path = pending.get_nowait()
+                except queue.Empty:
+                    break
+
+                try:
+                    action(ftp, path)
+                    with lock:
+                        succeeded[0] += 1
+                except ftplib.Error as e:
+                    with lock:
+                        errors.append(f"{path}: {e}")
+                except (OSError, EOFError) as e:
+                    pending.put(path)
+                    with lock:
+                        errors.append(f"Connection lost: {e}")
+                    break
+
+                with lock:
+                    done[0] += 1
+                    count = done[0]
+                if count % 50 == 0 or count == total:
+                    report(progress, f"{label}: {count}/{total}")
+        finally:
+            close_session(ftp)
+
+    parallelism = server_setting(info, 'parallelism')
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(min(parallelism, total))]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    while not pending.empty():
+        errors.append(f"{pending.get_nowait()}: not processed")
+    return succeeded[0], errors
+
+def delete_remote_tree(info, items, progress=None):
+    errors = []
+    files, dirs = [], []
+    deleted_files = deleted_dirs = 0
+    try:
+        walker = create_session(info)
+    except ftplib.all_errors as e:
+        return 0, 0, [f"Connection failed: {e}"]
+
+    try:
+        for path, is_dir in items:
+            if is_dir:
+                report(progress, f"Scanning {path}...")
+                sub_files, sub_dirs = walk_remote_tree(walker, path, errors)
+                files.extend(sub_files)
+                dirs.extend(sub_dirs)
+            else:
+                files.append(path)
+
+        deleted_files, pool_errors = run_pooled(info, files, lambda ftp, path: ftp.delete(path), "Deleting files", progress)
+        errors.extend(pool_errors)
+
+        walker.cwd('/')
+        dirs.sort(key=lambda path: path.count('/'), reverse=True)
+        for index, path in enumerate(dirs, 1):
+            try:
+                walker.rmd(path)
+                deleted_dirs += 1
+            except ftplib.Error as e:
+                errors.append(f"{path}: {e}")
+            if index % 50 == 0 or index == len(dirs):
+                report(progress, f"Removing folders: {index}/{len(dirs)}")
+    except ftplib.all_errors as e:
+        errors.append(f"Delete aborted: {e}")
+    finally:
+        close_session(walker)
+
+    return deleted_files, deleted_dirs, errors
+
+def transfer_between_servers(src_info, dst_info, items, dest_dir, progress=None):
+    errors = []
+    copied = 0
+    use_fxp = not (src_info.get('tls') or dst_info.get('tls'))
+    try:
+        src = create_session(src_info)
+    except ftplib.all_errors as e:
+        return 0, [f"Connection failed: {e}"]
+    try:
+        dst = create_session(dst_info)
+    except ftplib.all_errors as e:
+        close_session(src)
+        return 0, [f"Connection failed: {e}"]
+
+    try:
+        files = []
+        for path, is_dir in items:
+            base = posixpath.dirname(path)
+            if is_dir:
+                report(progress, f"Scanning {path}...")
+                sub_files, sub_dirs = walk_remote_tree(src, path, errors)
+                for sub_dir in sub_dirs:
+                    try:
+                        dst.mkd(posixpath.join(dest_dir, posixpath.relpath(sub_dir, base)))
+                    except ftplib.error_perm:
+                        pass
+                for sub_file in sub_files:
+                    files.append((sub_file, posixpath.join(dest_dir, posixpath.relpath(sub_file, base))))
+            else:
+                files.append((path, posixpath.join(dest_dir, posixpath.basename(path))))
+
+        for index, (src_path, dst_path) in enumerate(files, 1):
+            report(progress, f"Server transfer {index}/{len(files)}: {posixpath.basename(src_path)}")
+            if use_fxp:
+                try:
+                    fxp_copy(src, dst, src_path, dst_path)
+                    copied += 1
+                    continue
+                except FXPRefused:
+                    use_fxp = False
+                except ftplib.Error as e:
+                    errors.append(f"{src_path}: {e}")
+
+                close_session(src)
+                close_session(dst)
+                src = create_session(src_info)
+                dst = create_session(dst_info)
+                if use_fxp:
+                    continue
+
+            try:
+                relay_copy(
+                    src, dst, src_path, dst_path,
+                    server_setting(src_info, 'buffer_size'),
+                    RateLimiter(server_setting(src_info, 'rate_limit') * 1024)
+                )
+                copied += 1
+            except ftplib.Error as e:
+                errors.append(f"{src_path}: {e}")
+    except ftplib.all_errors as e:
+        errors.append(f"Transfer aborted: {e}")
+    finally:
+        close_session(src)
+        close_session(dst)
+
+    return copied, errors
+
+def fxp_copy(src, dst, src_path, dst_path):
+    src.voidcmd('TYPE I')
+    dst.voidcmd('TYPE I')
+    try:
+        host, port = ftplib.parse227(src.sendcmd('PASV'))
+        if not src.trust_server_pasv_ipv4_address:
+            host = src.sock.getpeername()[0]
+        dst.sendport(host, port)
+    except (ftplib.error_perm, ftplib.error_reply) as e:
+        raise FXPRefused(e)
+
+    try:
+        resp = dst.sendcmd(f'STOR {dst_path}')
+        if resp[0] != '1':
+            raise ftplib.error_reply(resp)
+        resp = src.sendcmd(f'RETR {src_path}')
+        if resp[0] != '1':
+            raise ftplib.error_reply(resp)
+
+        src.voidresp()
+        dst.voidresp()
+    except ftplib.error_temp as e:
+        if str(e)[:3] in ('425', '426'):
+            raise FXPRefused(e)
+        raise
+
+def relay_copy(src, dst, src_path, dst_path, blocksize=65536, limiter=None):
+    src.voidcmd('TYPE I')
+    dst.voidcmd('TYPE I')
+    src_conn = src.transfercmd(f'RETR {src_path}')
+    try:
+        dst_conn = dst.transfercmd(f'STOR {dst_path}')
+    except ftplib.all_errors:
+        src_conn.close()
+        try:
+            src.voidresp()
+        except ftplib.all_errors:
+            pass
+        raise
+
+    with src_conn, dst_conn:
+        while True:
+            data = src_conn.recv(blocksize)
+            if not data:
+                break
+            dst_conn.sendall(data)
+            if limiter:
+                limiter.consume(len(data))
+        if isinstance(dst_conn, ssl.SSLSocket):
+            dst_conn.unwrap()
+
+    src.voidresp()
+    dst.voidresp()
+
+def fetch_remote_range(info, path, length, tail, listed_size=None):
+    ftp = create_session(info)
+    try:
+        ftp.voidcmd('TYPE I')
+        offset = 0
+        if tail:
+            try:
+                size = ftp.size(path)
+            except ftplib.error_perm:
+                size = None
+            if size is None:
+                size = listed_size
+            if size is None:
+                raise ftplib.error_reply(f"Cannot determine the size of {path}")
+            offset = max(0, size - length)
+
+        conn = ftp.transfercmd(f'RETR {path}', rest=offset or None)
+        chunks = []
+        received = 0
+        with conn:
+            while received < length:
+                data = conn.recv(min(65536, length - received))
+                if not data:
+                    break
+                chunks.append(data)
+                received += len(data)
+
+        if received >= length:
+            try:
+                ftp.abort()
+            except ftplib.all_errors:
+                pass
+
+        return b''.join(chunks)
+    finally:
+        close_session(ftp)
+
+def format_preview(data):
+    if b'\0' not in data:
+        start = 0
+        while start < min(3, len(data)) and data[start] & 0xC0 == 0x80:
+            start += 1
+        try:
+            return data[start:].decode('utf-8')
+        except UnicodeDecodeError as e:
+            if e.start >= len(data) - start - 3:
+                try:
+                    return data[start:start + e.start].decode('utf-8')
+                except UnicodeDecodeError:
+                    pass
+
+    lines = []
+    for offset in range(0, len(data), 16):
+        chunk = data[offset:offset + 16]
+        hex_part = ' '.join(f"{b:02x}" for b in chunk)
+        text_part = ''.join(chr(b) if 32 <= b < 127 else '.' for b in chunk)
+        lines.append(f"{offset:08x}  {hex_part:<47}  {text_part}")
+    return '\n'.join(lines)
+
+def open_index(index_path):
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(index_path)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS entries (
+            server TEXT NOT NULL,
+            parent TEXT NOT NULL,
+            name TEXT NOT NULL,
+            size INTEGER,
+            modified TEXT,
+            is_dir INTEGER NOT NULL,
+            PRIMARY KEY (server, parent, name)
+        )
+    ''')
+    db.execute('CREATE INDEX IF NOT EXISTS entries_name ON entries (server, name)')
+    return db
+
+def index_key(info):
+    return f"{info['username']}@{info['host']}:{info['port']}"
+
+def escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def update_index_dir(db, server, parent, entries):
+    dir_names = {entry['name'] for entry in entries if entry['is_dir']}
+    with db:
+        stale_dirs = db.execute(
+            'SELECT name FROM entries WHERE server = ? AND parent = ? AND is_dir = 1',
+            (server, parent)
+        ).fetchall()
+        for (name,) in stale_dirs:
+            if name in dir_names:
+                continue
+            path = posixpath.join(parent, name)
+            db.execute(
+                "DELETE FROM entries WHERE server = ? AND (parent = ? OR parent LIKE ? ESCAPE '\\')",
+                (server, path, escape_like(path.rstrip('/')) + '/%')
+            )
+
+        db.execute('DELETE FROM entries WHERE server = ? AND parent = ?', (server, parent))
+        db.executemany(
+            'INSERT INTO entries (server, parent, name, size, modified, is_dir) VALUES (?, ?, ?, ?, ?, ?)',
+            [(server, parent, entry['name'], entry['size'], entry['date'], int(entry['is_dir'])) for entry in entries]
+        )
+
+def search_index(db, server, pattern, limit=SEARCH_LIMIT):
+    if any(c in pattern for c in '*?['):
+        query = 'lower(name) GLOB lower(?)'
+    else:
+        query = "name LIKE ? ESCAPE '\\'"
+        pattern = f"%{escape_like(pattern)}%"
+    return db.execute(
+        f'SELECT parent, name, size, modified, is_dir FROM entries '
+        f'WHERE server = ? AND {query} ORDER BY parent, name LIMIT {int(limit)}',
+        (server, pattern)
+    ).fetchall()
+
+def read_local_metadata(directory, name):
+    try:
+        stats = os.stat(os.path.join(directory, name))
+    except OSError as e:
+        print(f"Error processing {name}: {e}")
+        return name, (name, "", "", "")
+
+    is_dir = stat.S_ISDIR(stats.st_mode)
+    size = "" if is_dir else format_size(stats.st_size)
+    modified = datetime.fromtimestamp(stats.st_mtime).strftime('%Y-%m-%d %H:%M')
+    file_type = 'Directory' if is_dir else (mimetypes.guess_type(name)[0] or 'File')
+    return name, (name, size, file_type, modified)
+
+class LocalListingCache:
+    def __init__(self, limit=32):
+        self.limit = limit
+        self.listings = {}
+
+    def get(self, directory):
+        dir_stats = os.stat(directory)
+        signature = (dir_stats.st_mtime_ns, dir_stats.st_size, dir_stats.st_nlink)
+        cached = self.listings.get(directory)
+        if cached and cached['signature'] == signature and cached['settled']:
+            return cached
+
+        entries = []
+        for entry in os.scandir(directory):
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            entries.append((entry.name, is_dir))
+
+        entries.sort(key=lambda x: (not x[1], x[0].lower()))
+        cached = {
+            'signature': signature,
+            'settled': time.time_ns() - dir_stats.st_mtime_ns > LOCAL_MTIME_GRANULARITY_NS,
+            'entries': entries,
+            'meta': {}
+        }
+        self.listings.pop(directory, None)
+        self.listings[directory] = cached
+        while len(self.listings) > self.limit:
+            self.listings.pop(next(iter(self.listings)))
+        return cached
+
+    def update_meta(self, directory, batch):
+        cached = self.listings.get(directory)
+        if cached is not None:
+            cached['meta'].update(batch)
+
+    def invalidate(self, directory):
+        self.listings.pop(directory, None)
+
+class ServerStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.servers = {}
+        self.loaded = False
+        self.deferred_callback = None
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.payload = None
+
+    def load(self):
+        if self.path.exists():
+            try:
+                with open(self.path) as f:
+                    return json.load(f)
+            except:
+                return {}
+        return {}
+
+    def merge(self, servers):
+        servers.update(self.servers)
+        self.servers = servers
+        self.loaded = True
+        if self.deferred_callback is not None:
+            callback, self.deferred_callback = self.deferred_callback, None
+            self.save(callback)
+
+    def save(self, callback=None):
+        if not self.loaded:
+            self.deferred_callback = callback or (lambda error: None)
+            return None
+
+        payload = json.dumps(self.servers, indent=2)
+        with self.lock:
+            self.payload = payload
+        thread = threading.Thread(target=self.write, args=(callback,))
+        thread.start()
+        return thread
+
+    def write(self, callback=None):
+        error = None
+        with self.write_lock:
+            with self.lock:
+                payload, self.payload = self.payload, None
+            if payload is not None:
+                temp_path = self.path.with_suffix('.json.tmp')
+                try:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(temp_path, 'w') as f:
+                        f.write(payload)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(temp_path, self.path)
+                except OSError as e:
+                    error = e
+
+        if callback:
+            callback(error)
@@ -1,16 +1,18 @@
 import os
-import json
 import shutil
+import sqlite3
 import ftplib
+import posixpath
 import threading
+import itertools
 import subprocess
-import mimetypes
-from datetime import datetime
+from collections import OrderedDict
 from pathlib import Path
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
 import ttkbootstrap as ttk
 from tkinterdnd2 import DND_FILES, TkinterDnD
+import ftp_core
 
 class FTPClient:
     def __init__(self):
@@ -23,32 +25,47 @@ class FTPClient:
         self.root.geometry("1000x700")
         
         self.ftp = None
+        self.connection_info = None
         self.current_remote_dir = "/"
         self.current_local_dir = str(Path.home())
         self.transfer_queue = []
         self.is_connected = False
+        self.local_cache = ftp_core.LocalListingCache()
+        self.local_items = {}
+        self.local_scan_id = 0
+        self.local_view_top = 0.0
+        self.index_thread = None
+        self.remote_sizes = {}
+        self.preview_bytes = 64 * 1024
+        self.preview_cache = OrderedDict()
+        self.preview_cache_limit = 8 * 1024 * 1024
         
-        self.saved_servers = self.load_saved_servers()
+        self.server_store = ftp_core.ServerStore(Path.home() / '.ftp_client' / 'servers.json')
         self.setup_ui()
         self.setup_bindings()
+        self.root.after_idle(self.root.after, 0, self.finish_startup)
+
+    def finish_startup(self):
         self.refresh_local_files()
+        threading.Thread(target=self.process_load_saved_servers, daemon=True).start()
 
-    def format_size(self, size):
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size < 1024.0:
-                return f"{size:.1f} {unit}"
-            size /= 1024.0
-        return f"{size:.1f} PB"
+    def process_load_saved_servers(self):
+        servers = self.server_store.load()
+        self.root.after(0, self.apply_saved_servers, servers)
 
-    def load_saved_servers(self):
-        config_path = Path.home() / '.ftp_client' / 'servers.json'
-        if config_path.exists():
-            try:
-                with open(config_path) as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+    def apply_saved_servers(self, servers):
+        self.server_store.merge(servers)
+        self.server_combo['values'] = list(self.server_store.servers.keys())
+        self.target_combo['values'] = list(self.server_store.servers.keys())
+
+    def store_saved_servers(self, success_message=None):
+        self.server_store.save(lambda error: self.root.after(0, self.finish_store_servers, success_message, error))
+
+    def finish_store_servers(self, success_message, error):
+        if error:
+            messagebox.showerror("Error", f"Failed to save servers: {str(error)}")
+        elif success_message:
+            messagebox.showinfo("Success", success_message)
 
     def browse_local_directory(self):
         directory = filedialog.askdirectory(
@@ -82,6 +99,7 @@ class FTPClient:
                 except Exception as e:
                     messagebox.showerror("Error", f"Failed to copy {file}: {str(e)}")
         
+        self.invalidate_local_cache()
         self.refresh_local_files()
         return event.action
 
@@ -141,6 +159,8 @@ class FTPClient:
 
     def on_local_path_change(self, *args):
         path = self.local_path_var.get()
+        if path == self.current_local_dir:
+            return
         if os.path.exists(path) and os.path.isdir(path):
             self.current_local_dir = path
             self.refresh_local_files()
@@ -164,6 +184,7 @@ class FTPClient:
         self.setup_toolbar()
         self.setup_quickconnect()
         self.setup_connection_panel()
+        self.setup_status_bar()
         self.setup_main_panel()
 
     def setup_toolbar(self):
@@ -208,6 +229,15 @@ class FTPClient:
         self.password_var = tk.StringVar()
         ttk.Entry(quick_frame, textvariable=self.password_var, show="*").pack(side=tk.LEFT, padx=5)
         
+        self.tls_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(quick_frame, text="FTPS", variable=self.tls_var).pack(side=tk.LEFT, padx=5)
+        
+        self.tls_skip_verify_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(quick_frame, text="Skip Cert Check", variable=self.tls_skip_verify_var).pack(side=tk.LEFT, padx=5)
+        
+        self.compress_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(quick_frame, text="Compress", variable=self.compress_var).pack(side=tk.LEFT, padx=5)
+        
         ttk.Button(quick_frame, text="Connect", command=self.quick_connect).pack(side=tk.LEFT, padx=5)
 
     def setup_connection_panel(self):
@@ -220,17 +250,34 @@ class FTPClient:
         ttk.Label(server_frame, text="Saved Servers:").pack(side=tk.LEFT)
         self.server_combo = ttk.Combobox(
             server_frame, 
-            values=list(self.saved_servers.keys()),
+            values=list(self.server_store.servers.keys()),
             state="readonly"
         )
         self.server_combo.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         
+        ttk.Label(server_frame, text="Transfer To:").pack(side=tk.LEFT)
+        self.target_combo = ttk.Combobox(
+            server_frame, 
+            values=list(self.server_store.servers.keys()),
+            state="readonly"
+        )
+        self.target_combo.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        
         btn_frame = ttk.Frame(conn_frame)
         btn_frame.pack(fill=tk.X, pady=2)
         
         ttk.Button(btn_frame, text="Connect", command=self.connect_to_server).pack(side=tk.LEFT, padx=2)
         ttk.Button(btn_frame, text="Disconnect", command=self.disconnect).pack(side=tk.LEFT, padx=2)
         ttk.Button(btn_frame, text="Save Server", command=self.save_server).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_frame, text="Server Settings", command=self.edit_server_settings).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_frame, text="Server Transfer", command=self.queue_server_transfer).pack(side=tk.LEFT, padx=2)
+
+    def setup_status_bar(self):
+        self.status_var = tk.StringVar(value="Ready")
+        ttk.Label(self.main_container, textvariable=self.status_var, anchor="w").pack(side=tk.BOTTOM, fill=tk.X, pady=(5, 0))
+
+    def set_status(self, text):
+        self.root.after(0, self.status_var.set, text)
 
     def setup_main_panel(self):
         main_frame = ttk.Frame(self.main_container)
@@ -284,12 +331,12 @@ class FTPClient:
         self.local_tree.column("type", width=100, minwidth=80)
         self.local_tree.column("modified", width=150, minwidth=120)
         
-        vsb = ttk.Scrollbar(browser_frame, orient="vertical", command=self.local_tree.yview)
+        self.local_vsb = ttk.Scrollbar(browser_frame, orient="vertical", command=self.local_tree.yview)
         hsb = ttk.Scrollbar(browser_frame, orient="horizontal", command=self.local_tree.xview)
-        self.local_tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.local_tree.configure(yscrollcommand=self.on_local_scroll, xscrollcommand=hsb.set)
         
         self.local_tree.grid(row=0, column=0, sticky="nsew")
-        vsb.grid(row=0, column=1, sticky="ns")
+        self.local_vsb.grid(row=0, column=1, sticky="ns")
         hsb.grid(row=1, column=0, sticky="ew")
         
         browser_frame.grid_columnconfigure(0, weight=1)
@@ -306,6 +353,18 @@ class FTPClient:
         path_entry = ttk.Entry(nav_frame, textvariable=self.remote_path_var)
         path_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill=tk.X, pady=(0, 5))
+        
+        ttk.Label(search_frame, text="Search: ").pack(side=tk.LEFT)
+        self.remote_search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.remote_search_var)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        search_entry.bind('<Return>', lambda e: self.search_remote_index())
+        
+        ttk.Button(search_frame, text="Find", command=self.search_remote_index).pack(side=tk.LEFT, padx=5)
+        ttk.Button(search_frame, text="Index Folder", command=self.start_remote_index).pack(side=tk.LEFT)
+        
         browser_frame = ttk.Frame(parent)
         browser_frame.pack(fill=tk.BOTH, expand=True)
         
@@ -403,6 +462,9 @@ class FTPClient:
 
         self.remote_context_menu = tk.Menu(self.root, tearoff=0)
         self.remote_context_menu.add_command(label="Download", command=self.queue_download)
+        self.remote_context_menu.add_command(label="Send to Server", command=self.queue_server_transfer)
+        self.remote_context_menu.add_command(label="Preview Start", command=lambda: self.preview_remote_file(False))
+        self.remote_context_menu.add_command(label="Preview End", command=lambda: self.preview_remote_file(True))
         self.remote_context_menu.add_separator()
         self.remote_context_menu.add_command(label="Copy Path", command=self.copy_remote_path)
         self.remote_context_menu.add_separator()
@@ -479,6 +541,7 @@ class FTPClient:
             new_path = os.path.join(self.current_local_dir, new_name)
             try:
                 os.rename(old_path, new_path)
+                self.invalidate_local_cache()
                 self.refresh_local_files()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to rename: {str(e)}")
@@ -502,7 +565,15 @@ class FTPClient:
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to rename: {str(e)}")
 
+    def on_local_scroll(self, first, last):
+        self.local_vsb.set(first, last)
+        self.local_view_top = float(first)
+
+    def invalidate_local_cache(self, directory=None):
+        self.local_cache.invalidate(directory or self.current_local_dir)
+
     def refresh_all(self):
+        self.invalidate_local_cache()
         self.refresh_local_files()
         if self.is_connected:
             self.refresh_remote_files()
@@ -510,40 +581,70 @@ class FTPClient:
     def refresh_local_files(self):
         for item in self.local_tree.get_children():
             self.local_tree.delete(item)
+        self.local_items = {}
+        self.local_scan_id += 1
         
         try:
             if self.current_local_dir != str(Path.home()):
-                parent = os.path.dirname(self.current_local_dir)
                 self.local_tree.insert('', 'end', text="..", values=("..", "", "Parent Directory", ""))
             
-            entries = []
-            for entry in os.scandir(self.current_local_dir):
-                try:
-                    stats = entry.stat()
-                    size = stats.st_size if entry.is_file() else ""
-                    modified = datetime.fromtimestamp(stats.st_mtime).strftime('%Y-%m-%d %H:%M')
-                    file_type = 'Directory' if entry.is_dir() else (mimetypes.guess_type(entry.name)[0] or 'File')
-                    
-                    entries.append((
-                        entry.name,
-                        self.format_size(size) if size != "" else "",
-                        file_type,
-                        modified,
-                        entry.is_dir()   
-                    ))
-                except Exception as e:
-                    print(f"Error processing {entry.name}: {e}")
-
-            entries.sort(key=lambda x: (not x[4], x[0].lower()))
+            directory = self.current_local_dir
+            cached = self.local_cache.get(directory)
             
-            for entry in entries:
-                self.local_tree.insert('', 'end', text=entry[0], values=entry[:-1])
+            pending = []
+            for name, is_dir in cached['entries']:
+                values = cached['meta'].get(name)
+                if values is None:
+                    values = (name, "", "Directory" if is_dir else "", "")
+                    pending.append(name)
+                self.local_items[name] = self.local_tree.insert('', 'end', text=name, values=values)
                     
             self.local_path_var.set(self.current_local_dir)
             
+            if pending:
+                threading.Thread(
+                    target=self.load_local_metadata,
+                    args=(directory, pending, self.local_scan_id),
+                    daemon=True
+                ).start()
+            
         except Exception as e:
             messagebox.showerror("Error", f"Failed to refresh local files: {str(e)}")
 
+    def load_local_metadata(self, directory, names, scan_id, batch_size=200):
+        loaded = [False] * len(names)
+        view_top = None
+        cursor = 0
+        remaining = len(names)
+        
+        while remaining and scan_id == self.local_scan_id:
+            if view_top != self.local_view_top:
+                view_top = self.local_view_top
+                cursor = min(int(view_top * len(names)), len(names) - 1)
+            
+            batch = []
+            for index in itertools.chain(range(cursor, len(names)), range(0, cursor)):
+                if loaded[index]:
+                    continue
+                loaded[index] = True
+                cursor = index
+                batch.append(ftp_core.read_local_metadata(directory, names[index]))
+                if len(batch) == batch_size:
+                    break
+            
+            remaining -= len(batch)
+            self.root.after(0, self.apply_local_metadata, directory, scan_id, batch)
+
+    def apply_local_metadata(self, directory, scan_id, batch):
+        self.local_cache.update_meta(directory, batch)
+            
+        if scan_id != self.local_scan_id:
+            return
+        for name, values in batch:
+            item = self.local_items.get(name)
+            if item is not None:
+                self.local_tree.item(item, values=values)
+
     def refresh_remote_files(self):
         if not self.is_connected:
             return
@@ -560,54 +661,216 @@ class FTPClient:
             self.ftp.retrlines('LIST', file_list.append)
             
             entries = []
+            listing = []
             for line in file_list:
                 try:
-                    parts = line.split(None, 8)
-                    if len(parts) < 9:
+                    info = ftp_core.parse_list_line(line)
+                    if not info or info['name'] in ('.', '..'):
                         continue
-                        
-                    permissions = parts[0]
-                    size = int(parts[4])
-                    date = ' '.join(parts[5:8])
-                    name = parts[8]
+                    listing.append(info)
                     
-                    if name in ('.', '..'):
-                        continue
-                    
-                    file_type = 'Directory' if permissions.startswith('d') else 'File'
+                    file_type = 'Directory' if info['is_dir'] else 'File'
                     
                     entries.append((
-                        name,
-                        self.format_size(size) if file_type != 'Directory' else "",
+                        info['name'],
+                        ftp_core.format_size(info['size']) if file_type != 'Directory' else "",
                         file_type,
-                        date,
-                        permissions,
-                        file_type == 'Directory'
+                        info['date'],
+                        info['permissions'],
+                        info['is_dir']
                     ))
                 except Exception as e:
                     print(f"Error parsing remote file listing: {e}")
             
             entries.sort(key=lambda x: (not x[5], x[0].lower()))
+            self.remote_sizes = {info['name']: info['size'] for info in listing}
             
             for entry in entries:
                 self.remote_tree.insert('', 'end', text=entry[0], values=entry[:-1])
                     
             self.remote_path_var.set(self.current_remote_dir)
+            self.update_index_listing(self.connection_info, self.current_remote_dir, listing)
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to refresh remote files: {str(e)}")
 
+    def index_path(self):
+        return Path.home() / '.ftp_client' / 'index.db'
+
+    def start_remote_index(self):
+        if not self.is_connected:
+            messagebox.showerror("Error", "Not connected to server")
+            return
+        if self.index_thread and self.index_thread.is_alive():
+            messagebox.showinfo("Index", "Indexing is already running")
+            return
+            
+        self.index_thread = threading.Thread(
+            target=self.process_remote_index,
+            args=(self.connection_info, self.current_remote_dir),
+            daemon=True
+        )
+        self.index_thread.start()
+
+    def process_remote_index(self, info, root_path):
+        server = ftp_core.index_key(info)
+        errors = []
+        dir_count = file_count = 0
+        try:
+            db = ftp_core.open_index(self.index_path())
+        except sqlite3.Error as e:
+            self.root.after(0, self.show_error_summary, "Index Error", [str(e)])
+            return
+        try:
+            ftp = ftp_core.create_session(info)
+        except ftplib.all_errors as e:
+            db.close()
+            self.root.after(0, self.show_error_summary, "Index Error", [f"Connection failed: {e}"])
+            return
+            
+        try:
+            pending = [root_path]
+            while pending:
+                parent = pending.pop()
+                try:
+                    entries = ftp_core.list_remote_dir(ftp, parent)
+                except ftplib.error_perm as e:
+                    errors.append(f"{parent}: {e}")
+                    continue
+                    
+                ftp_core.update_index_dir(db, server, parent, entries)
+                dir_count += 1
+                for info_entry in entries:
+                    if info_entry['is_dir']:
+                        pending.append(posixpath.join(parent, info_entry['name']))
+                    else:
+                        file_count += 1
+                if dir_count % 20 == 0:
+                    self.set_status(f"Indexing: {dir_count} folders, {file_count} files")
+        except (sqlite3.Error, ftplib.all_errors) as e:
+            errors.append(f"Indexing aborted: {e}")
+        finally:
+            ftp_core.close_session(ftp)
+            db.close()
+            
+        self.set_status(f"Indexed {dir_count} folders and {file_count} files with {len(errors)} errors")
+        self.root.after(0, self.show_error_summary, "Index Errors", errors)
+
+    def update_index_listing(self, info, parent, entries):
+        if not self.index_path().exists():
+            return
+        threading.Thread(
+            target=self.process_index_listing,
+            args=(ftp_core.index_key(info), parent, entries),
+            daemon=True
+        ).start()
+
+    def process_index_listing(self, server, parent, entries):
+        try:
+            db = ftp_core.open_index(self.index_path())
+            try:
+                if db.execute('SELECT 1 FROM entries WHERE server = ? LIMIT 1', (server,)).fetchone():
+                    ftp_core.update_index_dir(db, server, parent, entries)
+            finally:
+                db.close()
+        except sqlite3.Error as e:
+            print(f"Error updating remote index: {e}")
+
+    def search_remote_index(self):
+        if not self.is_connected:
+            messagebox.showerror("Error", "Not connected to server")
+            return
+            
+        pattern = self.remote_search_var.get().strip()
+        if not pattern:
+            return
+            
+        self.status_var.set(f"Searching for {pattern}...")
+        threading.Thread(
+            target=self.process_search,
+            args=(ftp_core.index_key(self.connection_info), pattern),
+            daemon=True
+        ).start()
+
+    def process_search(self, server, pattern):
+        try:
+            db = ftp_core.open_index(self.index_path())
+            try:
+                results = ftp_core.search_index(db, server, pattern)
+            finally:
+                db.close()
+        except sqlite3.Error as e:
+            self.set_status("Ready")
+            self.root.after(0, self.show_error_summary, "Search Error", [f"Failed to search index: {e}"])
+            return
+            
+        self.set_status(f"Found {len(results)} matches")
+        self.root.after(0, self.show_search_results, results)
+
+    def show_search_results(self, results):
+        window = tk.Toplevel(self.root)
+        if len(results) >= ftp_core.SEARCH_LIMIT:
+            window.title(f"Search Results (showing first {len(results)})")
+        else:
+            window.title(f"Search Results ({len(results)})")
+        window.geometry("700x400")
+        
+        columns = ("path", "size", "modified")
+        tree = ttk.Treeview(window, columns=columns, show="headings", selectmode="browse")
+        tree.heading("path", text="Path")
+        tree.heading("size", text="Size")
+        tree.heading("modified", text="Modified")
+        tree.column("path", width=450)
+        tree.column("size", width=100)
+        tree.column("modified", width=150)
+        
+        vsb = ttk.Scrollbar(window, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        locations = {}
+        for parent, name, size, modified, is_dir in results:
+            item = tree.insert('', 'end', values=(
+                posixpath.join(parent, name),
+                "" if is_dir else ftp_core.format_size(size),
+                modified
+            ))
+            locations[item] = (parent, name)
+            
+        def on_open(event):
+            selection = tree.selection()
+            if selection:
+                self.jump_to_remote(*locations[selection[0]])
+                
+        tree.bind('<Double-1>', on_open)
+
+    def jump_to_remote(self, parent, name):
+        if not self.is_connected:
+            return
+            
+        self.current_remote_dir = parent
+        self.refresh_remote_files()
+        for item in self.remote_tree.get_children():
+            if self.remote_tree.item(item)['text'] == name:
+                self.remote_tree.selection_set(item)
+                self.remote_tree.focus(item)
+                self.remote_tree.see(item)
+                break
+
     def quick_connect(self):
+        info = {
+            'host': self.host_var.get(),
+            'port': self.port_var.get(),
+            'username': self.username_var.get(),
+            'password': self.password_var.get(),
+            'tls': self.tls_var.get(),
+            'tls_skip_verify': self.tls_skip_verify_var.get(),
+            'compress': self.compress_var.get()
+        }
         try:
-            self.ftp = ftplib.FTP()
-            self.ftp.connect(
-                self.host_var.get(),
-                int(self.port_var.get())
-            )
-            self.ftp.login(
-                self.username_var.get(),
-                self.password_var.get()
-            )
+            self.ftp = ftp_core.create_session(info)
+            self.connection_info = info
             self.is_connected = True
             self.current_remote_dir = "/"
             self.refresh_remote_files()
@@ -622,11 +885,10 @@ class FTPClient:
             messagebox.showerror("Error", "Please select a server")
             return
             
-        server_info = self.saved_servers[selected]
+        server_info = self.server_store.servers[selected]
         try:
-            self.ftp = ftplib.FTP()
-            self.ftp.connect(server_info['host'], int(server_info['port']))
-            self.ftp.login(server_info['username'], server_info['password'])
+            self.ftp = ftp_core.create_session(server_info)
+            self.connection_info = server_info
             self.is_connected = True
             self.current_remote_dir = "/"
             self.refresh_remote_files()
@@ -643,6 +905,7 @@ class FTPClient:
                 pass
             finally:
                 self.ftp = None
+                self.connection_info = None
                 self.is_connected = False
                 for item in self.remote_tree.get_children():
                     self.remote_tree.delete(item)
@@ -652,23 +915,48 @@ class FTPClient:
         if not name:
             return
             
-        self.saved_servers[name] = {
+        server_info = dict(self.server_store.servers.get(name, {}))
+        server_info.update({
             'host': self.host_var.get(),
             'port': self.port_var.get(),
             'username': self.username_var.get(),
-            'password': self.password_var.get()
-        }
-        
-        self.server_combo['values'] = list(self.saved_servers.keys())
+            'password': self.password_var.get(),
+            'tls': self.tls_var.get(),
+            'tls_skip_verify': self.tls_skip_verify_var.get(),
+            'compress': self.compress_var.get()
+        })
+        self.server_store.servers[name] = server_info
         
-        config_path = Path.home() / '.ftp_client' / 'servers.json'
-        config_path.parent.mkdir(parents=True, exist_ok=True)
-        try:
-            with open(config_path, 'w') as f:
-                json.dump(self.saved_servers, f)
-            messagebox.showinfo("Success", "Server saved successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save server: {str(e)}")
+        self.server_combo['values'] = list(self.server_store.servers.keys())
+        self.target_combo['values'] = list(self.server_store.servers.keys())
+        self.store_saved_servers("Server saved successfully!")
+
+    def edit_server_settings(self):
+        selected = self.server_combo.get()
+        if not selected:
+            messagebox.showerror("Error", "Please select a server")
+            return
+            
+        server_info = self.server_store.servers[selected]
+        prompts = [
+            ('parallelism', "Parallel connections:", 1),
+            ('buffer_size', "Transfer buffer size (bytes):", 1024),
+            ('rate_limit', "Rate limit in KB/s (0 for unlimited):", 0),
+        ]
+        settings = {}
+        for key, prompt, minvalue in prompts:
+            value = simpledialog.askinteger(
+                "Server Settings",
+                prompt,
+                initialvalue=ftp_core.server_setting(server_info, key),
+                minvalue=minvalue
+            )
+            if value is None:
+                return
+            settings[key] = value
+            
+        server_info.update(settings)
+        self.store_saved_servers("Server settings saved!")
 
     def create_folder(self):
         folder_name = simpledialog.askstring("New Folder", "Enter folder name:")
@@ -679,6 +967,7 @@ class FTPClient:
             try:
                 new_path = os.path.join(self.current_local_dir, folder_name)
                 os.makedirs(new_path)
+                self.invalidate_local_cache()
                 self.refresh_local_files()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to create local folder: {str(e)}")
@@ -706,6 +995,7 @@ class FTPClient:
                             os.remove(path)
                     except Exception as e:
                         messagebox.showerror("Error", f"Failed to delete {path}: {str(e)}")
+                self.invalidate_local_cache()
                 self.refresh_local_files()
                 
         elif self.remote_tree.focus() and self.is_connected:
@@ -713,17 +1003,39 @@ class FTPClient:
             if not selected:
                 return
                 
-            if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete the selected items?"):
-                for item in selected:
-                    name = self.remote_tree.item(item)['text']
-                    try:
-                        self.ftp.delete(name)
-                    except:
-                        try:
-                            self.ftp.rmd(name)
-                        except Exception as e:
-                            messagebox.showerror("Error", f"Failed to delete {name}: {str(e)}")
-                self.refresh_remote_files()
+            items = []
+            for item in selected:
+                name = self.remote_tree.item(item)['text']
+                if name == "..":
+                    continue
+                is_dir = self.remote_tree.set(item, "type") == 'Directory'
+                items.append((posixpath.join(self.current_remote_dir, name), is_dir))
+            if not items:
+                return
+                
+            if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete the selected items?\nFolders are deleted with all of their contents."):
+                threading.Thread(
+                    target=self.process_remote_delete,
+                    args=(self.connection_info, items),
+                    daemon=True
+                ).start()
+
+    def process_remote_delete(self, info, items):
+        deleted_files, deleted_dirs, errors = ftp_core.delete_remote_tree(info, items, self.set_status)
+        self.root.after(0, self.finish_remote_delete, deleted_files, deleted_dirs, errors)
+
+    def show_error_summary(self, title, errors):
+        if not errors:
+            return
+        details = "\n".join(errors[:20])
+        if len(errors) > 20:
+            details += f"\n... and {len(errors) - 20} more"
+        messagebox.showerror(title, details)
+
+    def finish_remote_delete(self, file_count, dir_count, errors):
+        self.status_var.set(f"Deleted {file_count} files and {dir_count} folders with {len(errors)} errors")
+        self.show_error_summary("Delete Errors", errors)
+        self.refresh_remote_files()
 
     def queue_upload(self):
         if not self.is_connected:
@@ -751,6 +1063,117 @@ class FTPClient:
             file_name = self.remote_tree.item(item)['text']
             self.queue_transfer('download', [file_name])
 
+    def queue_server_transfer(self):
+        if not self.is_connected:
+            messagebox.showerror("Error", "Not connected to server")
+            return
+            
+        target = self.target_combo.get()
+        if not target:
+            messagebox.showerror("Error", "Please select a destination server")
+            return
+            
+        items = []
+        for item in self.remote_tree.selection():
+            name = self.remote_tree.item(item)['text']
+            if name == "..":
+                continue
+            is_dir = self.remote_tree.set(item, "type") == 'Directory'
+            items.append((posixpath.join(self.current_remote_dir, name), is_dir))
+        if not items:
+            return
+            
+        dest_dir = simpledialog.askstring("Server Transfer", f"Destination folder on {target}:", initialvalue="/")
+        if not dest_dir:
+            return
+            
+        threading.Thread(
+            target=self.process_server_transfer,
+            args=(self.connection_info, self.server_store.servers[target], items, dest_dir),
+            daemon=True
+        ).start()
+
+    def process_server_transfer(self, src_info, dst_info, items, dest_dir):
+        copied, errors = ftp_core.transfer_between_servers(src_info, dst_info, items, dest_dir, self.set_status)
+        self.root.after(0, self.finish_server_transfer, copied, errors)
+
+    def finish_server_transfer(self, copied, errors):
+        self.status_var.set(f"Server transfer finished: {copied} files copied with {len(errors)} errors")
+        self.show_error_summary("Server Transfer Errors", errors)
+
+    def preview_remote_file(self, tail):
+        if not self.is_connected:
+            return
+            
+        selected = self.remote_tree.selection()
+        if not selected:
+            return
+            
+        item = selected[0]
+        name = self.remote_tree.item(item)['text']
+        if name == ".." or self.remote_tree.set(item, "type") == 'Directory':
+            return
+            
+        path = posixpath.join(self.current_remote_dir, name)
+        listed_size = self.remote_sizes.get(name)
+        key = (
+            ftp_core.index_key(self.connection_info),
+            path,
+            listed_size,
+            self.remote_tree.set(item, "modified"),
+            tail
+        )
+        if key in self.preview_cache:
+            self.preview_cache.move_to_end(key)
+            self.show_preview(path, self.preview_cache[key], tail)
+            return
+            
+        self.set_status(f"Fetching preview of {name}...")
+        threading.Thread(
+            target=self.process_preview,
+            args=(self.connection_info, path, key, tail, listed_size),
+            daemon=True
+        ).start()
+
+    def process_preview(self, info, path, key, tail, listed_size):
+        try:
+            data = ftp_core.fetch_remote_range(info, path, self.preview_bytes, tail, listed_size)
+        except ftplib.all_errors as e:
+            self.set_status("Ready")
+            self.root.after(0, self.show_error_summary, "Preview Error", [f"{path}: {e}"])
+            return
+            
+        self.root.after(0, self.finish_preview, path, key, data, tail)
+
+    def finish_preview(self, path, key, data, tail):
+        self.preview_cache[key] = data
+        total = sum(len(value) for value in self.preview_cache.values())
+        while total > self.preview_cache_limit and len(self.preview_cache) > 1:
+            _, evicted = self.preview_cache.popitem(last=False)
+            total -= len(evicted)
+            
+        self.status_var.set("Ready")
+        self.show_preview(path, data, tail)
+
+    def show_preview(self, path, data, tail):
+        window = tk.Toplevel(self.root)
+        window.title(f"{'End' if tail else 'Start'} of {posixpath.basename(path)} ({ftp_core.format_size(len(data))})")
+        window.geometry("800x500")
+        
+        text = tk.Text(window, wrap="none", font=("Courier", 10))
+        vsb = ttk.Scrollbar(window, orient="vertical", command=text.yview)
+        hsb = ttk.Scrollbar(window, orient="horizontal", command=text.xview)
+        text.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        
+        text.grid(row=0, column=0, sticky="nsew")
+        vsb.grid(row=0, column=1, sticky="ns")
+        hsb.grid(row=1, column=0, sticky="ew")
+        window.grid_columnconfigure(0, weight=1)
+        window.grid_rowconfigure(0, weight=1)
+        
+        text.insert('1.0', ftp_core.format_preview(data))
+        text.configure(state="disabled")
+
     def queue_transfer(self, direction, files):
         for file in files:
             self.transfer_queue.append({
@@ -771,16 +1194,21 @@ class FTPClient:
         threading.Thread(target=self.process_transfer, args=(transfer,)).start()
 
     def process_transfer(self, transfer):
+        blocksize = ftp_core.server_setting(self.connection_info, 'buffer_size')
+        limiter = ftp_core.RateLimiter(ftp_core.server_setting(self.connection_info, 'rate_limit') * 1024)
         try:
             if transfer['direction'] == 'upload':
                 if os.path.isfile(transfer['source']):
                     with open(transfer['source'], 'rb') as f:
                         filename = os.path.basename(transfer['source'])
-                        self.ftp.storbinary(f'STOR {filename}', f)
+                        self.ftp.storbinary(f'STOR {filename}', f, blocksize, lambda data: limiter.consume(len(data)))
             else:   
                 local_path = os.path.join(self.current_local_dir, transfer['source'])
                 with open(local_path, 'wb') as f:
-                    self.ftp.retrbinary(f'RETR {transfer["source"]}', f.write)
+                    def write(data):
+                        f.write(data)
+                        limiter.consume(len(data))
+                    self.ftp.retrbinary(f'RETR {transfer["source"]}', write, blocksize)
             
             self.refresh_all()
             
@@ -0,0 +1,272 @@
+import os
+import ssl
+import posixpath
+import sys
+import socket
+import threading
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CERT_FILE = os.path.join(HERE, 'standin_cert.pem')
+KEY_FILE = os.path.join(HERE, 'standin_key.pem')
+
+
+def server_info(server, **options):
+    info = {'host': '127.0.0.1', 'port': server.port, 'username': 'user', 'password': 'secret'}
+    info.update(options)
+    return info
+
+
+class StandInFTPServer:
+    def __init__(self, mode_z=True):
+        self.mode_z = mode_z
+        self.files = {}
+        self.dirs = {'/'}
+        self.busy = set()
+        self.drop_once = set()
+        self.refuse_port = False
+        self.unsupported = set()
+        self.commands = []
+        self.session_reused = []
+        self.stored_wire_sizes = {}
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(CERT_FILE, KEY_FILE)
+        self.listener = socket.create_server(('127.0.0.1', 0))
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+
+    def add_file(self, path, data):
+        parent = posixpath.dirname(path)
+        while parent not in self.dirs:
+            self.dirs.add(parent)
+            parent = posixpath.dirname(parent)
+        self.files[path] = data
+
+    def children(self, path):
+        names = {}
+        for entries, is_dir in ((self.dirs, True), (self.files, False)):
+            for child in list(entries):
+                if child != path and posixpath.dirname(child) == path:
+                    names[posixpath.basename(child)] = is_dir
+        return names
+
+    def listing(self, path):
+        lines = []
+        for name, is_dir in sorted(self.children(path).items()):
+            if is_dir:
+                lines.append(f'drwxr-xr-x 1 user group 0 Jan 01 00:00 {name}')
+            else:
+                size = len(self.files[posixpath.join(path, name)])
+                lines.append(f'-rw-r--r-- 1 user group {size} Jan 01 00:00 {name}')
+        return ''.join(line + '\r\n' for line in lines).encode()
+
+    def accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_OOBINLINE, 1)
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn):
+        try:
+            self.serve(conn)
+        except OSError:
+            conn.close()
+
+    def serve(self, conn):
+        control = conn
+        reader = control.makefile('rb')
+        protected = False
+        mode = 'S'
+        cwd = '/'
+        rest = 0
+        passive = None
+        active = None
+
+        def reply(text):
+            control.sendall(text.encode() + b'\r\n')
+
+        def open_data():
+            nonlocal passive, active
+            if active:
+                data_conn = socket.create_connection(active)
+                active = None
+            else:
+                data_conn, _ = passive.accept()
+                passive.close()
+                passive = None
+            if protected:
+                data_conn = self.context.wrap_socket(data_conn, server_side=True)
+                self.session_reused.append(data_conn.session_reused)
+            return data_conn
+
+        def close_data(data_conn):
+            if protected:
+                try:
+                    data_conn.unwrap()
+                except (OSError, ssl.SSLError):
+                    pass
+            data_conn.close()
+
+        reply('220 stand-in ready')
+        while True:
+            line = reader.readline()
+            if not line:
+                break
+            verb, _, arg = line.decode().strip().partition(' ')
+            verb = verb.upper()
+            path = posixpath.normpath(posixpath.join(cwd, arg)) if arg else cwd
+            self.commands.append((verb, arg))
+
+            if path in self.drop_once:
+                self.drop_once.discard(path)
+                break
+            if verb in self.unsupported:
+                reply('502 command not implemented')
+                continue
+            if path in self.busy and verb in ('RETR', 'STOR', 'DELE', 'RMD'):
+                reply('450 file busy')
+                continue
+
+            if verb == 'AUTH':
+                reply('234 AUTH TLS ok')
+                try:
+                    control = self.context.wrap_socket(conn, server_side=True)
+                except (OSError, ssl.SSLError):
+                    break
+                reader = control.makefile('rb')
+            elif verb == 'USER':
+                reply('331 password please')
+            elif verb == 'PASS':
+                reply('230 logged in')
+            elif verb in ('PBSZ', 'TYPE'):
+                reply('200 ok')
+            elif verb == 'PROT':
+                protected = arg.upper() == 'P'
+                reply('200 ok')
+            elif verb == 'FEAT':
+                features = ' MODE Z\r\n' if self.mode_z else ''
+                control.sendall(f'211-Features:\r\n AUTH TLS\r\n{features}211 End\r\n'.encode())
+            elif verb == 'MODE':
+                if arg.upper() == 'Z' and not self.mode_z:
+                    reply('504 mode not supported')
+                else:
+                    mode = arg.upper()
+                    reply('200 mode set')
+            elif verb == 'PWD':
+                reply(f'257 "{cwd}"')
+            elif verb == 'CWD':
+                if path in self.dirs:
+                    cwd = path
+                    reply('250 ok')
+                else:
+                    reply('550 no such directory')
+            elif verb == 'MKD':
+                if path in self.dirs or path in self.files:
+                    reply('550 already exists')
+                else:
+                    self.dirs.add(path)
+                    reply(f'257 "{path}" created')
+            elif verb == 'RMD':
+                if path not in self.dirs:
+                    reply('550 no such directory')
+                elif self.children(path):
+                    reply('550 directory not empty')
+                else:
+                    self.dirs.discard(path)
+                    reply('250 removed')
+            elif verb == 'DELE':
+                if self.files.pop(path, None) is None:
+                    reply('550 no such file')
+                else:
+                    reply('250 deleted')
+            elif verb == 'SIZE':
+                if path in self.files:
+                    reply(f'213 {len(self.files[path])}')
+                else:
+                    reply('550 no such file')
+            elif verb == 'REST':
+                rest = int(arg)
+                reply('350 restarting')
+            elif verb == 'PASV':
+                passive = socket.create_server(('127.0.0.1', 0))
+                port = passive.getsockname()[1]
+                reply(f'227 Entering Passive Mode (127,0,0,1,{port >> 8},{port & 255})')
+            elif verb == 'PORT':
+                if self.refuse_port:
+                    reply('500 PORT not allowed')
+                    continue
+                fields = arg.split(',')
+                active = ('.'.join(fields[:4]), int(fields[4]) << 8 | int(fields[5]))
+                reply('200 PORT ok')
+            elif verb == 'LIST':
+                reply('150 here comes the listing')
+                data_conn = open_data()
+                data_conn.sendall(self.listing(path))
+                close_data(data_conn)
+                reply('226 listing sent')
+            elif verb == 'RETR':
+                if path not in self.files:
+                    reply('550 no such file')
+                    continue
+                reply('150 opening data connection')
+                data_conn = open_data()
+                payload = self.files[path][rest:]
+                rest = 0
+                if mode == 'Z':
+                    payload = zlib.compress(payload)
+                try:
+                    data_conn.sendall(payload)
+                except OSError:
+                    data_conn.close()
+                    reply('426 connection closed, transfer aborted')
+                    continue
+                close_data(data_conn)
+                reply('226 transfer complete')
+            elif verb == 'STOR':
+                reply('150 opening data connection')
+                data_conn = open_data()
+                chunks = []
+                while True:
+                    chunk = data_conn.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                payload = b''.join(chunks)
+                self.stored_wire_sizes[path] = len(payload)
+                self.add_file(path, zlib.decompress(payload) if mode == 'Z' else payload)
+                close_data(data_conn)
+                reply('226 transfer complete')
+            elif verb == 'ABOR':
+                reply('226 abort successful')
+            elif verb == 'QUIT':
+                reply('221 bye')
+                break
+            else:
+                reply('502 command not implemented')
+        if passive:
+            passive.close()
+        control.close()
+
+    def close(self):
+        self.listener.close()
+
+
+@pytest.fixture
+def standin_server():
+    server = StandInFTPServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def plain_standin_server():
+    server = StandInFTPServer(mode_z=False)
+    yield server
+    server.close()
@@ -0,0 +1,79 @@
+import io
+import ssl
+
+import pytest
+
+import ftp_core
+from conftest import CERT_FILE, server_info
+
+
+def trusted_session(info):
+    return ftp_core.create_session(info, ssl.create_default_context(cafile=CERT_FILE))
+
+
+def test_tls_data_connections_reuse_control_session(standin_server):
+    standin_server.files['/report.txt'] = b'hello over tls\n' * 100
+    ftp = trusted_session(server_info(standin_server, tls=True))
+    try:
+        for _ in range(2):
+            out = io.BytesIO()
+            ftp.retrbinary('RETR /report.txt', out.write)
+            assert out.getvalue() == standin_server.files['/report.txt']
+    finally:
+        ftp_core.close_session(ftp)
+
+    assert standin_server.session_reused == [True, True]
+
+
+def test_tls_rejects_untrusted_certificate(standin_server):
+    with pytest.raises(ssl.SSLError):
+        ftp_core.create_session(server_info(standin_server, tls=True))
+
+
+def test_mode_z_round_trip(standin_server):
+    payload = b'id,name,value\n' + b'42,widget,3.14\n' * 5000
+    standin_server.files['/data.csv'] = payload
+    ftp = trusted_session(server_info(standin_server, tls=True, compress=True))
+    try:
+        assert ftp.mode_z
+        out = io.BytesIO()
+        ftp.retrbinary('RETR /data.csv', out.write)
+        ftp.storbinary('STOR /copy.csv', io.BytesIO(payload))
+    finally:
+        ftp_core.close_session(ftp)
+
+    assert out.getvalue() == payload
+    assert standin_server.files['/copy.csv'] == payload
+    assert standin_server.stored_wire_sizes['/copy.csv'] < len(payload)
+    modes = [arg for verb, arg in standin_server.commands if verb == 'MODE']
+    assert modes == ['Z', 'S', 'Z', 'S']
+
+
+def test_mode_z_skips_precompressed_files(standin_server):
+    standin_server.files['/archive.gz'] = b'\x1f\x8b' + bytes(range(256))
+    ftp = trusted_session(server_info(standin_server, compress=True))
+    try:
+        out = io.BytesIO()
+        ftp.retrbinary('RETR /archive.gz', out.write)
+    finally:
+        ftp_core.close_session(ftp)
+
+    assert out.getvalue() == standin_server.files['/archive.gz']
+    assert not [verb for verb, _ in standin_server.commands if verb == 'MODE']
+
+
+def test_server_without_mode_z_uses_stream_mode(plain_standin_server):
+    payload = b'plain stream mode\n' * 1000
+    plain_standin_server.files['/log.txt'] = payload
+    ftp = trusted_session(server_info(plain_standin_server, tls=True, compress=True))
+    try:
+        assert not ftp.mode_z
+        out = io.BytesIO()
+        ftp.retrbinary('RETR /log.txt', out.write)
+        ftp.storbinary('STOR /up.txt', io.BytesIO(payload))
+    finally:
+        ftp_core.close_session(ftp)
+
+    assert out.getvalue() == payload
+    assert plain_standin_server.files['/up.txt'] == payload
+    assert not [verb for verb, _ in plain_standin_server.commands if verb == 'MODE']
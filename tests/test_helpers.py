@@ -0,0 +1,45 @@
+import io
+import zlib
+
+import ftp_core
+
+
+def test_compressed_reader_round_trip():
+    payload = b'timestamp,level,message\n' * 10000
+    reader = ftp_core.CompressedReader(io.BytesIO(payload))
+    chunks = []
+    while True:
+        chunk = reader.read(8192)
+        if not chunk:
+            break
+        chunks.append(chunk)
+
+    compressed = b''.join(chunks)
+    assert len(compressed) < len(payload)
+    assert zlib.decompress(compressed) == payload
+
+
+def test_compressed_reader_empty_file():
+    reader = ftp_core.CompressedReader(io.BytesIO(b''))
+    assert zlib.decompress(reader.read(8192)) == b''
+    assert reader.read(8192) == b''
+
+
+def test_parse_list_line():
+    info = ftp_core.parse_list_line('-rw-r--r--   1 user group  1234 Jan 01 12:00 my file.txt')
+    assert info == {
+        'name': 'my file.txt',
+        'size': 1234,
+        'date': 'Jan 01 12:00',
+        'permissions': '-rw-r--r--',
+        'is_dir': False
+    }
+
+
+def test_parse_list_line_directory_and_symlink():
+    assert ftp_core.parse_list_line('drwxr-xr-x 2 user group 4096 Feb 3 2023 releases')['is_dir']
+    assert ftp_core.parse_list_line('lrwxrwxrwx 1 user group 7 Feb 3 2023 latest -> v1.2.3')['name'] == 'latest'
+
+
+def test_parse_list_line_short_line():
+    assert ftp_core.parse_list_line('total 12') is None
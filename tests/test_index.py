@@ -0,0 +1,65 @@
+import pytest
+
+import ftp_core
+
+SERVER = 'user@example.com:21'
+
+
+def entry(name, is_dir=False, size=0):
+    return {'name': name, 'size': size, 'date': 'Jan 01 00:00', 'permissions': '', 'is_dir': is_dir}
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = ftp_core.open_index(tmp_path / 'index.db')
+    yield db
+    db.close()
+
+
+def rows(db):
+    return db.execute('SELECT parent, name, is_dir FROM entries ORDER BY parent, name').fetchall()
+
+
+def test_update_index_dir_purges_removed_folders(db):
+    ftp_core.update_index_dir(db, SERVER, '/', [entry('old', True), entry('keep', True)])
+    ftp_core.update_index_dir(db, SERVER, '/old', [entry('sub', True), entry('a.txt')])
+    ftp_core.update_index_dir(db, SERVER, '/old/sub', [entry('b.txt')])
+    ftp_core.update_index_dir(db, SERVER, '/keep', [entry('c.txt')])
+    ftp_core.update_index_dir(db, 'other@host:21', '/old', [entry('d.txt')])
+
+    ftp_core.update_index_dir(db, SERVER, '/', [entry('keep', True)])
+
+    assert rows(db) == [('/', 'keep', 1), ('/keep', 'c.txt', 0), ('/old', 'd.txt', 0)]
+
+
+def test_update_index_dir_purges_folder_replaced_by_file(db):
+    ftp_core.update_index_dir(db, SERVER, '/', [entry('data', True), entry('data_1', True)])
+    ftp_core.update_index_dir(db, SERVER, '/data', [entry('x.csv')])
+    ftp_core.update_index_dir(db, SERVER, '/data_1', [entry('y.csv')])
+
+    ftp_core.update_index_dir(db, SERVER, '/', [entry('data', size=10), entry('data_1', True)])
+
+    assert rows(db) == [('/', 'data', 0), ('/', 'data_1', 1), ('/data_1', 'y.csv', 0)]
+
+
+def test_search_index_substring_is_literal(db):
+    ftp_core.update_index_dir(db, SERVER, '/', [entry('100%_done.txt'), entry('100xydone.txt'), entry('Report.PDF')])
+
+    assert [row[1] for row in ftp_core.search_index(db, SERVER, '%_')] == ['100%_done.txt']
+    assert [row[1] for row in ftp_core.search_index(db, SERVER, 'report')] == ['Report.PDF']
+
+
+def test_search_index_glob_ignores_case(db):
+    ftp_core.update_index_dir(db, SERVER, '/', [entry('Report.PDF'), entry('notes.pdf'), entry('notes.txt')])
+
+    assert [row[1] for row in ftp_core.search_index(db, SERVER, '*.pdf')] == ['Report.PDF', 'notes.pdf']
+    assert [row[1] for row in ftp_core.search_index(db, SERVER, 'REPORT.*')] == ['Report.PDF']
+
+
+def test_search_index_is_limited_and_per_server(db):
+    ftp_core.update_index_dir(db, SERVER, '/', [entry(f'log{index:03}.txt') for index in range(20)])
+    ftp_core.update_index_dir(db, 'other@host:21', '/', [entry('log999.txt')])
+
+    results = ftp_core.search_index(db, SERVER, 'log', limit=5)
+    assert [row[1] for row in results] == [f'log{index:03}.txt' for index in range(5)]
+    assert ftp_core.search_index(db, 'other@host:21', 'log*') == [('/', 'log999.txt', 0, 'Jan 01 00:00', 0)]
@@ -0,0 +1,73 @@
+import os
+import time
+
+import ftp_core
+
+
+def set_mtime(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_listing_puts_folders_first(tmp_path):
+    (tmp_path / 'b.txt').write_text('b')
+    (tmp_path / 'A.txt').write_text('a')
+    (tmp_path / 'zdir').mkdir()
+
+    cached = ftp_core.LocalListingCache().get(str(tmp_path))
+
+    assert cached['entries'] == [('zdir', True), ('A.txt', False), ('b.txt', False)]
+
+
+def test_settled_listing_is_reused_with_its_metadata(tmp_path):
+    (tmp_path / 'a.txt').write_text('a')
+    set_mtime(tmp_path, time.time_ns() - 60 * 10**9)
+    cache = ftp_core.LocalListingCache()
+
+    first = cache.get(str(tmp_path))
+    cache.update_meta(str(tmp_path), [ftp_core.read_local_metadata(str(tmp_path), 'a.txt')])
+
+    assert first['settled']
+    assert cache.get(str(tmp_path)) is first
+    assert first['meta']['a.txt'][:3] == ('a.txt', '1.0 B', 'text/plain')
+
+
+def test_changed_folder_is_rescanned(tmp_path):
+    set_mtime(tmp_path, time.time_ns() - 60 * 10**9)
+    cache = ftp_core.LocalListingCache()
+    first = cache.get(str(tmp_path))
+
+    (tmp_path / 'new.txt').write_text('new')
+    second = cache.get(str(tmp_path))
+
+    assert second is not first
+    assert second['entries'] == [('new.txt', False)]
+
+
+def test_recently_modified_folder_is_rescanned_until_settled(tmp_path):
+    set_mtime(tmp_path, time.time_ns())
+    cache = ftp_core.LocalListingCache()
+    first = cache.get(str(tmp_path))
+    second = cache.get(str(tmp_path))
+
+    assert not first['settled']
+    assert second is not first
+    assert second['signature'] == first['signature']
+
+    set_mtime(tmp_path, time.time_ns() - 60 * 10**9)
+    third = cache.get(str(tmp_path))
+    assert third['settled']
+    assert cache.get(str(tmp_path)) is third
+
+
+def test_invalidate_and_limit(tmp_path):
+    cache = ftp_core.LocalListingCache(limit=2)
+    folders = []
+    for name in ('one', 'two', 'three'):
+        folder = tmp_path / name
+        folder.mkdir()
+        folders.append(str(folder))
+        cache.get(str(folder))
+
+    assert list(cache.listings) == folders[1:]
+    cache.invalidate(folders[2])
+    assert list(cache.listings) == folders[1:2]
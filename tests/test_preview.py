@@ -0,0 +1,50 @@
+import ftplib
+
+import pytest
+
+import ftp_core
+from conftest import server_info
+
+PAYLOAD = bytes(range(256)) * 1024
+
+
+def test_format_preview_text():
+    assert ftp_core.format_preview('line one\nline two\n'.encode()) == 'line one\nline two\n'
+
+
+def test_format_preview_trims_split_utf8_at_both_ends():
+    data = 'größe'.encode()
+    assert ftp_core.format_preview(data[:-2]) == 'grö'
+    assert ftp_core.format_preview(data[3:]) == 'ße'
+
+
+def test_format_preview_hex_dump():
+    assert ftp_core.format_preview(b'\x00\x01abc') == '00000000  ' + '00 01 61 62 63'.ljust(47) + '  ..abc'
+
+
+def test_fetch_remote_range_head_aborts_early(standin_server):
+    standin_server.add_file('/big.bin', PAYLOAD)
+
+    data = ftp_core.fetch_remote_range(server_info(standin_server), '/big.bin', 4096, tail=False)
+
+    assert data == PAYLOAD[:4096]
+    assert 'ABOR' in [verb for verb, _ in standin_server.commands]
+
+
+def test_fetch_remote_range_tail(standin_server):
+    standin_server.add_file('/big.bin', PAYLOAD)
+
+    data = ftp_core.fetch_remote_range(server_info(standin_server), '/big.bin', 4096, tail=True)
+
+    assert data == PAYLOAD[-4096:]
+    assert ('REST', str(len(PAYLOAD) - 4096)) in standin_server.commands
+
+
+def test_fetch_remote_range_tail_uses_listed_size_without_size_command(standin_server):
+    standin_server.add_file('/big.bin', PAYLOAD)
+    standin_server.unsupported.add('SIZE')
+    info = server_info(standin_server)
+
+    assert ftp_core.fetch_remote_range(info, '/big.bin', 100, tail=True, listed_size=len(PAYLOAD)) == PAYLOAD[-100:]
+    with pytest.raises(ftplib.error_reply):
+        ftp_core.fetch_remote_range(info, '/big.bin', 100, tail=True)
@@ -0,0 +1,63 @@
+import ftp_core
+from conftest import server_info
+
+
+def test_delete_remote_tree_removes_nested_folders(standin_server):
+    for index in range(30):
+        standin_server.add_file(f'/site/assets/img/{index}.png', b'png')
+    standin_server.add_file('/site/index.html', b'<html>')
+    standin_server.add_file('/notes.txt', b'notes')
+    standin_server.add_file('/keep/readme.txt', b'keep')
+
+    progress = []
+    files, dirs, errors = ftp_core.delete_remote_tree(
+        server_info(standin_server),
+        [('/site', True), ('/notes.txt', False)],
+        progress.append
+    )
+
+    assert (files, dirs, errors) == (32, 3, [])
+    assert set(standin_server.files) == {'/keep/readme.txt'}
+    assert standin_server.dirs == {'/', '/keep'}
+    assert 'Deleting files: 32/32' in progress
+
+
+def test_delete_remote_tree_reports_busy_file_and_keeps_going(standin_server):
+    for name in ('a', 'b', 'c', 'd', 'e'):
+        standin_server.add_file(f'/logs/{name}.log', b'log')
+    standin_server.busy.add('/logs/c.log')
+
+    files, dirs, errors = ftp_core.delete_remote_tree(server_info(standin_server), [('/logs', True)])
+
+    assert files == 4
+    assert dirs == 0
+    assert errors[0] == '/logs/c.log: 450 file busy'
+    assert errors[1].startswith('/logs: 550')
+    assert set(standin_server.files) == {'/logs/c.log'}
+
+
+def test_run_pooled_uses_the_given_connection(standin_server):
+    for index in range(10):
+        standin_server.add_file(f'/tmp/{index}', b'x')
+    info = server_info(standin_server, parallelism=2)
+
+    succeeded, errors = ftp_core.run_pooled(info, [f'/tmp/{index}' for index in range(10)], lambda ftp, path: ftp.delete(path), "Deleting")
+
+    assert (succeeded, errors) == (10, [])
+    assert not standin_server.children('/tmp')
+    assert [verb for verb, _ in standin_server.commands].count('USER') == 2
+
+
+def test_run_pooled_requeues_after_lost_connection(standin_server):
+    paths = ['/a', '/b', '/c']
+    for path in paths:
+        standin_server.add_file(path, b'x')
+    standin_server.drop_once.add('/b')
+    info = server_info(standin_server, parallelism=1)
+
+    succeeded, errors = ftp_core.run_pooled(info, paths, lambda ftp, path: ftp.delete(path), "Deleting")
+
+    assert succeeded == 1
+    assert errors[0].startswith('Connection lost')
+    assert sorted(errors[1:]) == ['/b: not processed', '/c: not processed']
+    assert set(standin_server.files) == {'/b', '/c'}
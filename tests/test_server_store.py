@@ -0,0 +1,74 @@
+import json
+import threading
+
+import ftp_core
+
+
+class Done:
+    def __init__(self):
+        self.event = threading.Event()
+        self.errors = []
+
+    def __call__(self, error):
+        self.errors.append(error)
+        self.event.set()
+
+    def wait(self):
+        assert self.event.wait(5)
+        return self.errors
+
+
+def test_save_before_load_merges_with_stored_servers(tmp_path):
+    path = tmp_path / 'servers.json'
+    path.write_text(json.dumps({'old': {'host': 'old.example.com'}, 'edited': {'host': 'before'}}))
+    store = ftp_core.ServerStore(path)
+
+    store.servers['edited'] = {'host': 'after'}
+    store.servers['new'] = {'host': 'new.example.com'}
+    done = Done()
+    assert store.save(done) is None
+    assert json.loads(path.read_text())['edited'] == {'host': 'before'}
+
+    store.merge(store.load())
+
+    assert done.wait() == [None]
+    assert json.loads(path.read_text()) == {
+        'old': {'host': 'old.example.com'},
+        'edited': {'host': 'after'},
+        'new': {'host': 'new.example.com'},
+    }
+    assert [p.name for p in tmp_path.iterdir()] == ['servers.json']
+
+
+def test_save_writes_latest_state_atomically(tmp_path):
+    path = tmp_path / 'config' / 'servers.json'
+    store = ftp_core.ServerStore(path)
+    store.merge(store.load())
+
+    threads = []
+    for index in range(5):
+        store.servers[f'server{index}'] = {'host': f'{index}.example.com'}
+        threads.append(store.save())
+    for thread in threads:
+        thread.join()
+
+    assert sorted(json.loads(path.read_text())) == [f'server{index}' for index in range(5)]
+    assert [p.name for p in path.parent.iterdir()] == ['servers.json']
+
+
+def test_load_ignores_corrupt_file(tmp_path):
+    path = tmp_path / 'servers.json'
+    path.write_text('{"truncated": ')
+    assert ftp_core.ServerStore(path).load() == {}
+
+
+def test_write_error_is_reported(tmp_path):
+    (tmp_path / 'blocked').write_text('not a folder')
+    store = ftp_core.ServerStore(tmp_path / 'blocked' / 'servers.json')
+    store.merge({})
+
+    done = Done()
+    store.save(done)
+
+    errors = done.wait()
+    assert len(errors) == 1 and isinstance(errors[0], OSError)
@@ -0,0 +1,84 @@
+import pytest
+
+import ftp_core
+from conftest import StandInFTPServer, server_info
+
+
+@pytest.fixture
+def target_server():
+    server = StandInFTPServer()
+    yield server
+    server.close()
+
+
+def verbs(server):
+    return [verb for verb, _ in server.commands]
+
+
+def test_fxp_copies_folders_server_to_server(standin_server, target_server):
+    standin_server.add_file('/pub/a.txt', b'alpha' * 1000)
+    standin_server.add_file('/pub/sub/b.bin', bytes(range(256)) * 64)
+
+    copied, errors = ftp_core.transfer_between_servers(
+        server_info(standin_server), server_info(target_server), [('/pub', True)], '/backup'
+    )
+
+    assert (copied, errors) == (2, [])
+    assert target_server.files['/backup/pub/a.txt'] == standin_server.files['/pub/a.txt']
+    assert target_server.files['/backup/pub/sub/b.bin'] == standin_server.files['/pub/sub/b.bin']
+    assert verbs(target_server).count('PORT') == 2
+    assert 'PASV' not in verbs(target_server)
+
+
+def test_refused_port_falls_back_to_relay(standin_server, target_server):
+    for name in ('one', 'two'):
+        standin_server.add_file(f'/{name}.txt', name.encode() * 500)
+    target_server.refuse_port = True
+
+    copied, errors = ftp_core.transfer_between_servers(
+        server_info(standin_server), server_info(target_server), [('/one.txt', False), ('/two.txt', False)], '/in'
+    )
+
+    assert (copied, errors) == (2, [])
+    assert target_server.files['/in/one.txt'] == b'one' * 500
+    assert target_server.files['/in/two.txt'] == b'two' * 500
+    assert verbs(target_server).count('PORT') == 1
+    assert verbs(target_server).count('PASV') == 2
+
+
+@pytest.mark.parametrize('refuse_port', [False, True])
+def test_per_file_errors_do_not_stop_the_batch(standin_server, target_server, refuse_port):
+    standin_server.add_file('/ok.txt', b'fine')
+    standin_server.add_file('/busy.txt', b'busy')
+    standin_server.busy.add('/busy.txt')
+    target_server.refuse_port = refuse_port
+
+    copied, errors = ftp_core.transfer_between_servers(
+        server_info(standin_server), server_info(target_server),
+        [('/missing.txt', False), ('/busy.txt', False), ('/ok.txt', False)], '/'
+    )
+
+    assert copied == 1
+    assert errors == ['/missing.txt: 550 no such file', '/busy.txt: 450 file busy']
+    assert target_server.files['/ok.txt'] == b'fine'
+
+
+def test_failed_reconnect_still_reports(standin_server, target_server, monkeypatch):
+    standin_server.add_file('/a.txt', b'a')
+    create_session = ftp_core.create_session
+    sessions = []
+
+    def flaky_session(info, context=None):
+        if len(sessions) == 2:
+            raise ConnectionRefusedError('connection refused')
+        sessions.append(create_session(info, context))
+        return sessions[-1]
+
+    monkeypatch.setattr(ftp_core, 'create_session', flaky_session)
+    copied, errors = ftp_core.transfer_between_servers(
+        server_info(standin_server), server_info(target_server), [('/missing.txt', False), ('/a.txt', False)], '/'
+    )
+
+    assert copied == 0
+    assert errors == ['/missing.txt: 550 no such file', 'Transfer aborted: connection refused']
+    assert all(ftp.sock is None for ftp in sessions)